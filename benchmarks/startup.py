@@ -0,0 +1,74 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+"""
+Startup time benchmark. Times a fresh interpreter importing the package,
+creating a scenario and running a short batch job, and fails if pygame gets
+imported along the way or the best run exceeds the time budget.
+
+Usage: python benchmarks/startup.py [budget in seconds]
+"""
+
+ROOT = Path(__file__).resolve().parent.parent
+REPEATS = 5
+
+CASES = {
+    'import': "import nbody",
+    'create': "import nbody; nbody.create('random')",
+    'batch': "from nbody.__main__ import main; main(['random', '--ticks', '10'])",
+}
+
+PYGAME_LOADED = 3     # Exit code of a run that imported pygame
+CHECK = f"; import sys; sys.exit({PYGAME_LOADED} if 'pygame' in sys.modules else 0)"
+
+
+class RunFailed(Exception):
+    pass
+
+
+def best_time(code):
+    """
+    Returns the fastest of a number of runs of code in a fresh interpreter,
+    or None if pygame was imported. Raises RunFailed with the stderr of a
+    run that failed for any other reason.
+    """
+    times = []
+    for i in range(REPEATS):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code + CHECK], cwd=ROOT,
+                                capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if result.returncode == PYGAME_LOADED:
+            return None
+        if result.returncode != 0:
+            raise RunFailed(result.stderr.strip())
+    return min(times)
+
+
+def main(budget):
+    baseline = best_time('pass')
+    failed = False
+    for name, code in CASES.items():
+        try:
+            t = best_time(code)
+        except RunFailed as e:
+            print(f'{name:<7}: FAILED, run exited with an error\n{e}')
+            failed = True
+            continue
+        if t is None:
+            print(f'{name:<7}: FAILED, pygame was imported')
+            failed = True
+            continue
+        overhead = t - baseline
+        status = 'ok' if overhead <= budget else 'FAILED, over budget'
+        failed = failed or overhead > budget
+        print(f'{name:<7}: {round(overhead, 3)}s {status}')
+    return failed
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    sys.exit(main(budget))
@@ -1,8 +1,7 @@
 import pygame
 import time
-from Color import Color
-from Ticker import Ticker
-from Simulations import Random_sim, Solar_system, User_controlled
+from .Color import Color
+from .Ticker import Ticker
 
 
 """
@@ -35,11 +34,12 @@ class Window:
         self.screen.fill(self.bg)
         self.pan_offset = [0,0]
 
-    def main_loop(self, simulation):
+    def main_loop(self, simulation, recorder=None):
         """
         Pygame main loop. Uses the ticker class to create consistent timespaces
         between ticks. In the main loop: Updates simulation, checks events,
-        updats statistics on screen, draws screen en increments tick. 
+        updats statistics on screen, draws screen en increments tick. If a
+        recorder is given, the bodies are written to it every tick.
         """
         running = True
         ticker = Ticker(start_time=time.time(), tick_len=1/30)
@@ -50,6 +50,8 @@ class Window:
 
             # Update simulation                       
             simulation.update_bodies(ticker.i)  
+            if recorder is not None:
+                recorder.write(simulation.bodies)
             self.screen.fill(self.bg)
             simulation.draw(self.screen, self.pan_offset, self.bg)
             
@@ -62,9 +64,14 @@ class Window:
                         self.pan(simulation)
                     if event.button == 3:
                         self.mouse_draw(simulation)
+                    if event.button == 4:
+                        self.mouse_zoom(simulation, 1.1)
+                    if event.button == 5:
+                        self.mouse_zoom(simulation, 1/1.1)
                 if event.type == pygame.KEYDOWN:
                     if event.key in arrowkey_hold:
                         arrowkey_hold[event.key] = True
+                    simulation.key_pressed(event.key)
                 if event.type == pygame.KEYUP:
                     if event.key in arrowkey_hold:
                         arrowkey_hold[event.key] = False
@@ -82,6 +89,7 @@ class Window:
             self.display_textlist(stats, Color.DGREY, 15, 5)
             bodies_text = f'nr_bodies : {len(simulation.bodies)}'
             self.display_text(bodies_text, Color.DGREY, 650, 5)
+            self.display_textlist(simulation.info_text(), Color.DGREY, 650, 20)
             
             # Screen display and next tick
             pygame.display.flip()               # Draw screen
@@ -102,7 +110,7 @@ class Window:
             self.pan_offset[0] = initial_offset[0] + pan_new[0] - pan_start[0]
             self.pan_offset[1] = initial_offset[1] + pan_new[1] - pan_start[1]
             self.screen.fill(self.bg)           
-            sim.draw(self.screen, self.pan_offset, self.bg)     
+            simulation.draw(self.screen, self.pan_offset, self.bg)     
             pygame.display.flip()
             for event in pygame.event.get():    # check for mouse release
                 if event.type == pygame.MOUSEBUTTONUP:
@@ -122,13 +130,20 @@ class Window:
             self.screen.fill(self.bg)
             pygame.draw.circle(self.screen, Color.DGREY, start_pos, int(duration))
             pygame.draw.line(self.screen, Color.DGREY, start_pos, end_pos)
-            sim.draw(self.screen, self.pan_offset, self.bg)
+            simulation.draw(self.screen, self.pan_offset, self.bg)
             pygame.display.flip()
             for event in pygame.event.get():    # check for mouse release
                 if event.type == pygame.MOUSEBUTTONUP:
                     hold = False
                     simulation.user_drawn_particle(start_pos, end_pos, duration, self.pan_offset)
             duration += 0.03
+
+    def mouse_zoom(self, simulation, factor):
+        """
+        Zooms the simulation screen in or out around the mouse position using
+        the mouse wheel.
+        """
+        simulation.zoom_view(factor, pygame.mouse.get_pos(), self.pan_offset)
         
     def display_text(self, text, color, x, y):
         """
@@ -156,30 +171,15 @@ class Window:
 
 
 
-# Parameters
-x, y = 800, 800
-simtype = 3
-
-# Simulation types
-if simtype == 1:
-    sim = Random_sim(G=0.001)
-    sim.generate_bodies(nr_planets=5, nr_particles=50, max_pos = [x,y])
-    
-elif simtype == 2:
-    sim = Solar_system(G=0.001)
-    sim.generate_bodies(nr_planets=60, max_pos=[x,y])
-
-elif simtype == 3:
-    sim = User_controlled(G=0.001)
-    sim.generate_bodies(max_pos=[x,y])
-
-
-# Running
-w = Window(x, y, Color.LGREY)
-w.main_loop(sim)
-    
-
-
-
-
-
+def run(simulation, window_x=800, window_y=800, record_path=None):
+    """
+    Opens a window and runs a simulation or replay in it. Records the
+    simulation to record_path if given.
+    """
+    w = Window(window_x, window_y, Color.LGREY)
+    if record_path is not None:
+        from .Replay import Recorder
+        with Recorder(record_path) as recorder:
+            w.main_loop(simulation, recorder)
+    else:
+        w.main_loop(simulation)
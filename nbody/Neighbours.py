@@ -0,0 +1,161 @@
+from collections import defaultdict
+from math import floor, hypot
+
+
+class NeighbourList:
+    """
+    Verlet neighbour list, used to find bodies within a short distance of
+    each other without comparing every pair of bodies. Every body keeps a
+    set of the bodies within the interaction radius plus a skin distance.
+    The sets stay valid until a body has moved more than half the skin, so
+    they only have to be rebuilt once in a while. Rebuilding uses a cell
+    list: bodies are binned in square cells slightly larger than the list
+    radius, so only the bodies in the 9 surrounding cells have to be compared.
+
+    The interaction radius is the cutoff, or the largest body radius if that
+    is larger, so the list can be used for merging as well as for a cutoff
+    force law.
+
+    Bodies keep moving during a tick while the list is used, so the distance
+    a body moves in a tick is counted as displacement as well. The skin is
+    widened to a margin of a few ticks worth of movement if the given skin
+    is too small for that.
+    """
+
+    def __init__(self, cutoff, skin):
+        self.cutoff = cutoff
+        self.skin = skin
+        self.margin = skin      # Skin used at the last rebuild
+        self.sets = {}          # Neighbour set of each body
+        self.positions = {}     # Position of each body at the last rebuild
+        self.cells = defaultdict(list)
+        self.radius = 0         # Interaction radius at the last rebuild
+
+        # Initializing statistics
+        self.rebuilds = 0
+        self.checked = 0
+        self.hits = 0
+
+    def interaction_radius(self, bodies):
+        return max([self.cutoff] + [b.rad for b in bodies])
+
+    def cell(self, x, y):
+        # Cells are indexed on the positions at the last rebuild, which can be
+        # half a skin off, so the cells are enlarged for bodies inserted after it
+        size = self.radius + 2 * self.margin
+        return (floor(x / size), floor(y / size))
+
+    def update(self, bodies):
+        """
+        Brings the neighbour list up to date with a list of bodies. Bodies
+        that were added or removed since the last update are inserted or
+        removed incrementally. The list is rebuilt when a body could move more
+        than half the skin from its position at the last rebuild during this
+        tick, or has outgrown the interaction radius.
+        """
+        if self.interaction_radius(bodies) > self.radius:
+            return self.rebuild(bodies)
+        for b in bodies:
+            if b not in self.positions:
+                self.insert(b)
+            x, y = self.positions[b]
+            if hypot(b.p[0] - x, b.p[1] - y) + hypot(*b.v) > self.margin / 2:
+                return self.rebuild(bodies)
+        if len(self.positions) > len(bodies):
+            current = set(bodies)
+            for b in [b for b in self.positions if b not in current]:
+                self.remove(b)
+
+    def rebuild(self, bodies):
+        """
+        Rebuilds the neighbour sets of all bodies using a cell list.
+        """
+        self.rebuilds += 1
+        self.radius = self.interaction_radius(bodies)
+        self.margin = max([self.skin] + [4 * hypot(*b.v) for b in bodies])
+        self.sets = {b: set() for b in bodies}
+        self.positions = {b: (b.p[0], b.p[1]) for b in bodies}
+        self.cells = defaultdict(list)
+        for b in bodies:
+            self.cells[self.cell(*b.p)].append(b)
+        for b in bodies:
+            self.sets[b] = self.find(b)
+
+    def find(self, body):
+        """
+        Returns the bodies in the cells around a body that are within the
+        interaction radius plus the skin.
+        """
+        list_radius_sq = (self.radius + self.margin) ** 2
+        cx, cy = self.cell(*body.p)
+        found = set()
+        for i in (cx-1, cx, cx+1):
+            for j in (cy-1, cy, cy+1):
+                for b in self.cells.get((i, j), ()):
+                    if b is not body:
+                        if (b.p[0] - body.p[0])**2 + (b.p[1] - body.p[1])**2 < list_radius_sq:
+                            found.add(b)
+        return found
+
+    def insert(self, body):
+        """
+        Adds a new body to the neighbour list without rebuilding it.
+        """
+        self.positions[body] = (body.p[0], body.p[1])
+        self.cells[self.cell(*body.p)].append(body)
+        self.sets[body] = self.find(body)
+        for b in self.sets[body]:
+            self.sets[b].add(body)
+
+    def remove(self, body):
+        """
+        Removes a body from the neighbour list without rebuilding it.
+        """
+        for b in self.sets.pop(body):
+            self.sets[b].discard(body)
+        self.cells[self.cell(*self.positions.pop(body))].remove(body)
+
+    def candidates(self, body):
+        """
+        Returns a copy of the neighbours of a body, in the order of the list
+        of bodies, which is the order of their uids. Used for merging, where
+        the distance is tested against a radius that grows with every merge,
+        so the order has to match that of a full scan.
+        """
+        self.checked += len(self.sets[body])
+        return sorted(self.sets[body], key=lambda b: b.uid)
+
+    def absorb(self, body, other):
+        """
+        Removes a body that merged into another body. The merged body inherits
+        its neighbours, since its radius has grown.
+        """
+        self.hits += 1
+        inherited = self.sets[other] - {body}
+        self.remove(other)
+        self.sets[body] |= inherited
+        for b in inherited:
+            self.sets[b].add(body)
+
+    def within(self, body, distance):
+        """
+        Returns the neighbours of a body that are closer than the given
+        distance, which should not exceed the interaction radius.
+        """
+        found = []
+        for b in self.sets[body]:
+            if (b.p[0] - body.p[0])**2 + (b.p[1] - body.p[1])**2 < distance**2:
+                found.append(b)
+        self.checked += len(self.sets[body])
+        self.hits += len(found)
+        return found
+
+    def string_stats(self):
+        """
+        Returns all current stats values as a list of printeable strings
+        """
+        hit_rate = round(100 * self.hits / max(1, self.checked), 2)
+        avg_nbrs = round(sum(len(s) for s in self.sets.values()) / max(1, len(self.sets)), 2)
+        return [f'rebuilds: {self.rebuilds}',
+                f'hit_rate: {hit_rate}',
+                f'avg_nbrs: {avg_nbrs}']
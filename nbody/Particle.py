@@ -1,13 +1,33 @@
-import pygame
+from itertools import count
 from math import sin, cos, atan2
-from Color import ColorGradient
+from .Color import ColorGradient
+
+
+
+
+def arrow_points(x, y, theta, rad):
+    """
+    Returns the four corner points of an arrow on coordinates x and y, 
+    pointing in direction theta. The arrow is defined by X1, Y1 and Y2 which 
+    are multiplied by the given radius.
+    """
+    X1, Y1, Y2 = 0.6*rad, 1.6*rad, 0.3*rad
+    p_top = (int(x + Y1 * cos(theta)), int(y + Y1 * sin(theta)))
+    p_right = (int(x - X1 * sin(theta)), int(y + X1 * cos(theta)))
+    p_left = (int(x + X1 * sin(theta)), int(y - X1 * cos(theta)))
+    p_bottom = (int(x - Y2 * cos(theta)), int(y - Y2 * sin(theta)))
+    return (p_top, p_right, p_bottom, p_left)
 
 
 
 
 class Body:
     
+    # Unique body ids, used to follow a body across recorded frames
+    _uids = count()
+    
     def __init__(self, position, mass, color, trail_color, velocity, trail_size):
+        self.uid = next(Body._uids)
         self.m = mass           # Particle mass
         self.p = position       # Particle postion (unit vector: x,y)
         self.v = velocity       # Particle velocity (unit vector: x,y)
@@ -52,15 +72,17 @@ class Body:
         self.p[0] += self.v[0]
         self.p[1] += self.v[1]
     
-    def merge(self, bodies):
+    def merge(self, bodies, candidates=None):
         """
         Loops over a given list of bodies. If any of these bodies are 
         within the particles radius, merges the two particles.
         When two particles are merged, are their properties are merged as well. 
         The particle that merges with this particle subsequently gets removed
-        from the list of bodies.
+        from the list of bodies. If candidates are given, only those bodies
+        are considered for merging. Returns the merged bodies.
         """
-        for b in bodies:
+        merged = []
+        for b in bodies if candidates is None else candidates:
             if not b is self:
                 x_a, y_a = self.p[0], self.p[1]
                 x_b, y_b = b.p[0], b.p[1]
@@ -72,6 +94,8 @@ class Body:
                     self.m += b.m
                     self.rad = max(int(self.m ** (1/3)), 1)
                     bodies.remove(b)
+                    merged.append(b)
+        return merged
       
     def bounce(self, xbound, ybound):
         """
@@ -106,6 +130,7 @@ class Body:
         Draws a line connecting all segments of the prev_positions list using 
         a gradient.
         """
+        import pygame
         width = int(max(1, self.rad/3))
         g = ColorGradient(self.trail_color, (230, 230, 230), self.trail_size)
         positions = list(reversed(self.prev_positions))
@@ -114,11 +139,19 @@ class Body:
             col = g.get_color(i)
             pygame.draw.line(screen, col, p, offset_positions[i+1], width)
 
+    def heading(self):
+        """
+        Returns the direction the particle is facing, which is the direction
+        of its velocity by default.
+        """
+        return atan2(self.v[1], self.v[0])
+
     def draw_line(self, screen, pan_offset, to_position, color):
         """
         Draws a line from the particle to another position. Used for debugging
         and visualizing forces or angles.
         """
+        import pygame
         x = self.p[0] + pan_offset[0]
         y = self.p[1] + pan_offset[1]
         to_position[0] += pan_offset[0]
@@ -133,6 +166,8 @@ class Arrow(Body):
     Arrow shaped body, usefull to create a visual indication of a particles'
     velocity.
     """
+    
+    shape = 'arrow'
 
     def __init__(self, position, mass, color, trail_color, velocity, trail_size):
         super().__init__(position, mass, color, trail_color, velocity, trail_size) 
@@ -143,15 +178,10 @@ class Arrow(Body):
         direction. The arrow is defined by X1, Y1 and Y2 which are multiplied
         by the particles' radius.        
         """
+        import pygame
         x = self.p[0] + pan_offset[0]
         y = self.p[1] + pan_offset[1]
-        theta = atan2(self.v[1],self.v[0])
-        X1, Y1, Y2 = 0.6*self.rad, 1.6*self.rad, 0.3*self.rad
-        p_top = (int(x + Y1 * cos(theta)), int(y + Y1 * sin(theta)))
-        p_right = (int(x - X1 * sin(theta)), int(y + X1 * cos(theta)))
-        p_left = (int(x + X1 * sin(theta)), int(y - X1 * cos(theta)))
-        p_bottom = (int(x - Y2 * cos(theta)), int(y - Y2 * sin(theta)))
-        pointslist = (p_top, p_right, p_bottom, p_left)
+        pointslist = arrow_points(x, y, self.heading(), self.rad)
         pygame.draw.polygon(screen, self.color, pointslist)
     
     
@@ -162,10 +192,13 @@ class Planet(Body):
     Spherical body, useful for representing planets or general particles.
     """
     
+    shape = 'circle'
+    
     def __init__(self, position, mass, color, trail_color, velocity, trail_size):
         super().__init__(position, mass, color, trail_color, velocity, trail_size) 
     
     def draw(self, screen, pan_offset):
+        import pygame
         x = self.p[0] + pan_offset[0]
         y = self.p[1] + pan_offset[1]
         pygame.draw.circle(screen, self.color, (int(x),int(y)), self.rad)
@@ -177,26 +210,29 @@ class UserParticle(Body):
     Arrow shaped body, usefull to create a visual indication of a particles'
     velocity.
     """
+    
+    shape = 'arrow'
 
     def __init__(self, position, mass, color, trail_color, velocity, trail_size):
         super().__init__(position, mass, color, trail_color, velocity, trail_size) 
         self.angle = 0
     
+    def heading(self):
+        """
+        The user controlled particle faces the angle set with the arrow keys.
+        """
+        return self.angle
+    
     def draw(self, screen, pan_offset):
         """
         Draws an arrow on the particles' coordinates indicating its current
         direction. The arrow is defined by X1, Y1 and Y2 which are multiplied
         by the particles' radius.        
         """
+        import pygame
         x = self.p[0] + pan_offset[0]
         y = self.p[1] + pan_offset[1]
-        theta = self.angle
-        X1, Y1, Y2 = 0.6*self.rad, 1.6*self.rad, 0.3*self.rad
-        p_top = (int(x + Y1 * cos(theta)), int(y + Y1 * sin(theta)))
-        p_right = (int(x - X1 * sin(theta)), int(y + X1 * cos(theta)))
-        p_left = (int(x + X1 * sin(theta)), int(y - X1 * cos(theta)))
-        p_bottom = (int(x - Y2 * cos(theta)), int(y - Y2 * sin(theta)))
-        pointslist = (p_top, p_right, p_bottom, p_left)
+        pointslist = arrow_points(x, y, self.heading(), self.rad)
         pygame.draw.polygon(screen, self.color, pointslist)
     
     
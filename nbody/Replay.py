@@ -0,0 +1,467 @@
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from .Color import ColorGradient
+from .Particle import arrow_points
+
+
+"""
+File layout of a recording:
+    - Header: magic bytes and format version.
+    - Frames: per frame the number of bodies, followed by one column per
+      body property in the order of COLUMNS. Bodies are sorted on uid.
+    - Index: the byte offset of every frame.
+    - Footer: offset of the index, number of frames and the magic bytes.
+The index is written when the recording is closed, so frames can be read
+in any order without scanning the file. Columns are stored little endian
+and are copied into arrays when a frame is read, so no per body objects
+are created.
+"""
+
+MAGIC = b'NBDY'
+VERSION = 2
+HEADER = struct.Struct('<4sH')          # magic, version
+COUNT = struct.Struct('<I')             # number of bodies in a frame
+OFFSET = struct.Struct('<Q')            # byte offset of a frame
+FOOTER = struct.Struct('<QI4s')         # index offset, number of frames, magic
+
+# Name, array typecode and values per body of each column
+COLUMNS = [('uid', 'I', 1), ('x', 'f', 1), ('y', 'f', 1), ('heading', 'f', 1),
+           ('rad', 'H', 1), ('trail_size', 'H', 1), ('shape', 'B', 1),
+           ('color', 'B', 3), ('trail_color', 'B', 3)]
+POSITIONS = ('uid', 'x', 'y')           # Columns needed for trails
+
+# Bytes per body of a full frame and of a frame with only the positions
+BODY_BYTES = sum(array(t).itemsize * w for name, t, w in COLUMNS)
+POSITION_BYTES = sum(array(t).itemsize * w for name, t, w in COLUMNS if name in POSITIONS)
+
+SHAPES = ['circle', 'arrow']
+
+
+class Recorder:
+    """
+    Writes the bodies of a running simulation to disk, one frame per tick,
+    so the run can be reviewed afterwards with a Replay without recomputing
+    it.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.offsets = []
+
+    def write(self, bodies):
+        """
+        Appends the current state of a list of bodies as a new frame.
+        """
+        bodies = sorted(bodies, key=lambda b: b.uid)
+        values = {
+            'uid': [b.uid for b in bodies],
+            'x': [b.p[0] for b in bodies],
+            'y': [b.p[1] for b in bodies],
+            'heading': [b.heading() for b in bodies],
+            'rad': [b.rad for b in bodies],
+            'trail_size': [b.trail_size for b in bodies],
+            'shape': [SHAPES.index(b.shape) for b in bodies],
+            'color': [c for b in bodies for c in b.color],
+            'trail_color': [c for b in bodies for c in b.trail_color]}
+        self.offsets.append(self.file.tell())
+        self.file.write(COUNT.pack(len(bodies)))
+        for name, typecode, width in COLUMNS:
+            column = array(typecode, values[name])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            self.file.write(column.tobytes())
+
+    def close(self):
+        """
+        Writes the frame index and footer, and closes the file.
+        """
+        index_offset = self.file.tell()
+        self.file.write(b''.join(OFFSET.pack(o) for o in self.offsets))
+        self.file.write(FOOTER.pack(index_offset, len(self.offsets), MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+
+class Frame:
+    """
+    Columns of one recorded frame. A frame read for trails only has the
+    POSITIONS columns, a full frame has all COLUMNS.
+    """
+
+    def __init__(self, n, columns):
+        self.n = n
+        self.full = len(columns) == len(COLUMNS)
+        self.nbytes = sum(c.itemsize * len(c) for c in columns.values())
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    def index(self, uid, lo=0):
+        """
+        Returns the index of the body with the given uid, or None if it is
+        not in this frame. Bodies are sorted on uid, so a lower bound on the
+        index can be given as lo.
+        """
+        i = bisect_left(self.uid, uid, min(lo, self.n))
+        if i < self.n and self.uid[i] == uid:
+            return i
+        return None
+
+
+
+
+class Recording:
+    """
+    Read access to a recording on disk. The file is memory mapped, so frames
+    are only read from disk when they are decoded.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < HEADER.size + FOOTER.size:
+            raise ValueError(f'{path} is not a complete recording')
+        magic, version = HEADER.unpack_from(self.mm, 0)
+        index_offset, self.nr_frames, end_magic = FOOTER.unpack_from(
+            self.mm, len(self.mm) - FOOTER.size)
+        if magic != MAGIC or end_magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a complete recording')
+        if self.nr_frames == 0:
+            raise ValueError(f'{path} does not contain any frames')
+        self.offsets = [o for o, in OFFSET.iter_unpack(
+            self.mm[index_offset:index_offset + self.nr_frames * OFFSET.size])]
+
+    def count(self, i):
+        """
+        Returns the number of bodies in frame i, without reading the frame.
+        """
+        return COUNT.unpack_from(self.mm, self.offsets[i])[0]
+
+    def frame(self, i, names=None):
+        """
+        Reads the columns with the given names of frame i, or all columns if
+        no names are given.
+        """
+        offset = self.offsets[i]
+        n, = COUNT.unpack_from(self.mm, offset)
+        offset += COUNT.size
+        columns = {}
+        for name, typecode, width in COLUMNS:
+            column = array(typecode)
+            size = n * width * column.itemsize
+            if names is None or name in names:
+                column.frombytes(self.mm[offset:offset + size])
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                columns[name] = column
+            offset += size
+        return Frame(n, columns)
+
+    def close(self):
+        self.mm.close()
+
+
+
+
+class FrameCache:
+    """
+    Keeps the most recently used frames of a recording, up to a maximum
+    number of bytes. A background thread reads the frames ahead of the
+    playhead in the direction of playback, as well as the positions in the
+    frames behind it that are needed for trails.
+    """
+
+    def __init__(self, recording, max_bytes, ahead):
+        self.recording = recording
+        self.max_bytes = max_bytes
+        self.ahead = ahead
+        self.frames = OrderedDict()
+        self.nbytes = 0
+        self.wanted = []
+        self.pinned = set()     # Frames of the current request
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.running = True
+        self.thread = threading.Thread(target=self.prefetch, daemon=True)
+        self.thread.start()
+
+    def cached(self, i, full=True):
+        """
+        Returns frame i if it is in the cache, and has all columns if full
+        is set. Returns None otherwise.
+        """
+        with self.lock:
+            frame = self.frames.get(i)
+            if frame is None or (full and not frame.full):
+                return None
+            self.frames.move_to_end(i)
+            return frame
+
+    def get(self, i):
+        """
+        Returns full frame i. Frames that have not been prefetched yet are
+        read on the spot.
+        """
+        frame = self.cached(i)
+        if frame is None:
+            frame = self.recording.frame(i)
+            with self.lock:
+                self.store(i, frame)
+        return frame
+
+    def store(self, i, frame):
+        """
+        Adds a frame to the cache, dropping the least recently used frames
+        if the cache is full. Frames of the current request are never
+        dropped. Should be called while holding the lock.
+        """
+        if i in self.frames:
+            self.nbytes -= self.frames.pop(i).nbytes
+        self.frames[i] = frame
+        self.nbytes += frame.nbytes
+        if self.nbytes > self.max_bytes:
+            for j in [j for j in self.frames if j not in self.pinned]:
+                if self.nbytes <= self.max_bytes:
+                    break
+                self.nbytes -= self.frames.pop(j).nbytes
+
+    def request(self, frames):
+        """
+        Replaces the list of frames the prefetch thread should read, in
+        order of priority, as (frame number, full) pairs. These frames are
+        kept in the cache until the next request, so the request should fit
+        in the cache.
+        """
+        with self.changed:
+            self.wanted = [(i, full) for i, full in frames
+                           if 0 <= i < self.recording.nr_frames]
+            self.pinned = {i for i, full in self.wanted}
+            self.changed.notify()
+
+    def prefetch(self):
+        """
+        Prefetch thread. Reads the requested frames that are not in the
+        cache yet, then waits for a new request.
+        """
+        while True:
+            with self.changed:
+                while self.running and not self.wanted:
+                    self.changed.wait()
+                if not self.running:
+                    return
+                i, full = self.wanted.pop(0)
+                frame = self.frames.get(i)
+                if frame is not None and (frame.full or not full):
+                    continue
+            frame = self.recording.frame(i, None if full else POSITIONS)
+            with self.lock:
+                self.store(i, frame)
+
+    def close(self):
+        with self.changed:
+            self.running = False
+            self.changed.notify()
+        self.thread.join()
+
+
+
+
+class Replay:
+    """
+    Plays back a recording in the Window instead of a live simulation. It
+    has the same interface as a simulation, but update_bodies only moves the
+    playhead, so there is no physics cost. The playhead can move at any
+    speed, in both directions, and can be moved to any frame. Trails are
+    reconstructed from earlier frames, taken every 4th frame like the trails
+    of a live simulation.
+
+    Controls: space pauses, R reverses, +/- change the speed, the arrow keys
+    scrub through the recording, home/end and the number keys seek, and the
+    mouse wheel zooms.
+    """
+
+    def __init__(self, path, speed=1, cache_bytes=256 * 2**20, ahead=32):
+        self.recording = Recording(path)
+        self.cache = FrameCache(self.recording, cache_bytes, ahead)
+        self.playhead = 0
+        self.speed = speed
+        self.paused = False
+        self.zoom = 1
+        self.prefetch()
+
+    @property
+    def frame_nr(self):
+        return int(self.playhead)
+
+    @property
+    def bodies(self):
+        """
+        The uids of the bodies in the current frame.
+        """
+        return self.cache.get(self.frame_nr).uid
+
+    def seek(self, frame_nr):
+        """
+        Moves the playhead to the given frame, clamped to the recording.
+        """
+        self.playhead = min(max(0, frame_nr), self.recording.nr_frames - 1)
+        self.prefetch()
+
+    def prefetch(self):
+        """
+        Requests the current frame and the frames ahead of the playhead, in
+        the current direction and speed of playback, followed by the trail
+        frames behind it. The number of frames ahead and the trail length are
+        limited to what fits in the cache.
+        """
+        n = max(1, self.recording.count(self.frame_nr))
+        max_frames = self.cache.max_bytes // (n * BODY_BYTES)
+        step = self.speed if self.speed != 0 else 1
+        ahead = [int(self.playhead + k * step) for k in range(min(self.cache.ahead, max_frames))]
+        trail_bytes = self.cache.max_bytes - len(ahead) * n * BODY_BYTES
+        trail_size = min(200, trail_bytes // (n * POSITION_BYTES))
+        trail = self.trail_frames(max(ahead + [self.frame_nr]), trail_size)
+        self.cache.request([(i, True) for i in ahead] + [(i, False) for i in trail])
+
+    def trail_frames(self, frame_nr, trail_size=200):
+        """
+        Returns the frame numbers a trail of a given length is made of at
+        the given frame, from new to old. The given frame itself is not
+        included, the trail starts at the multiple of 4 below it.
+        """
+        last = (frame_nr - 1) - (frame_nr - 1) % 4
+        return list(range(last, max(-1, last - 4 * trail_size), -4))
+
+    def update_bodies(self, iteration):
+        """
+        Advances the playhead with the playback speed. Playback pauses at
+        either end of the recording.
+        """
+        if self.paused:
+            return
+        playhead = self.playhead + self.speed
+        if not 0 <= playhead < self.recording.nr_frames:
+            self.paused = True
+        self.seek(playhead)
+
+    def draw(self, screen, pan_offset, background_colour):
+        """
+        Draws the trails and bodies of the current frame on the Pygame screen.
+        Trails only use frames that are already in the cache, so they are
+        cut short while the frames behind the playhead are being prefetched.
+        """
+        import pygame
+        frame = self.cache.get(self.frame_nr)
+        history = []
+        for i in self.trail_frames(self.frame_nr, max(frame.trail_size, default=1) - 1):
+            previous = self.cache.cached(i, full=False)
+            if previous is None:
+                break
+            history.append(previous)
+        for k in range(frame.n):
+            positions = self.trail_positions(pan_offset, frame, k, history)
+            width = int(max(1, self.zoom * frame.rad[k]/3))
+            trail_color = tuple(frame.trail_color[3*k:3*k+3])
+            g = ColorGradient(trail_color, (230, 230, 230), frame.trail_size[k])
+            for i, p in enumerate(positions[:-1]):
+                pygame.draw.line(screen, g.get_color(i), p, positions[i+1], width)
+        for k in range(frame.n):
+            x, y = self.to_screen(frame.x[k], frame.y[k], pan_offset)
+            rad = max(1, int(frame.rad[k] * self.zoom))
+            color = tuple(frame.color[3*k:3*k+3])
+            if SHAPES[frame.shape[k]] == 'circle':
+                pygame.draw.circle(screen, color, (int(x),int(y)), rad)
+            else:
+                pointslist = arrow_points(x, y, frame.heading[k], rad)
+                pygame.draw.polygon(screen, color, pointslist)
+
+    def trail_positions(self, pan_offset, frame, k, history):
+        """
+        Returns the screen positions of the trail of body k of a frame, by
+        looking up its positions in the earlier frames of history, until the
+        trail size is reached or the body did not exist yet.
+        """
+        uid, trail_size = frame.uid[k], frame.trail_size[k]
+        positions = [self.to_screen(frame.x[k], frame.y[k], pan_offset)]
+        for previous in history[:trail_size - 1]:
+            # Bodies are only ever removed or appended, so a body can not
+            # have a lower index in an earlier frame
+            k_previous = previous.index(uid, k)
+            if k_previous is None:
+                break
+            positions.append(self.to_screen(previous.x[k_previous], previous.y[k_previous], pan_offset))
+        return positions
+
+    def to_screen(self, x, y, pan_offset):
+        """
+        Converts simulation coordinates to screen coordinates.
+        """
+        return (x * self.zoom + pan_offset[0], y * self.zoom + pan_offset[1])
+
+    def zoom_view(self, factor, center, pan_offset):
+        """
+        Zooms in or out by a factor, keeping the point under the given screen
+        position in place by adjusting the pan_offset.
+        """
+        pan_offset[0] = center[0] - (center[0] - pan_offset[0]) * factor
+        pan_offset[1] = center[1] - (center[1] - pan_offset[1]) * factor
+        self.zoom *= factor
+
+    def key_pressed(self, key):
+        """
+        Playback controls.
+        """
+        import pygame
+        if key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif key == pygame.K_r:
+            self.speed = -self.speed
+        elif key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.speed *= 2
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.speed /= 2
+        elif key == pygame.K_HOME:
+            self.seek(0)
+        elif key == pygame.K_END:
+            self.seek(self.recording.nr_frames - 1)
+        elif pygame.K_0 <= key <= pygame.K_9:
+            self.seek(int((key - pygame.K_0) / 10 * self.recording.nr_frames))
+        self.prefetch()
+
+    def info_text(self):
+        """
+        Returns the playback state as a list of printeable strings.
+        """
+        return [f'frame   : {self.frame_nr}/{self.recording.nr_frames - 1}',
+                f'speed   : {self.speed}' + (' (paused)' if self.paused else '')]
+
+    def user_drawn_particle(self, start_pos, end_pos, duration, pan_offset):
+        """
+        A recording can not be changed, drawn lines are ignored.
+        """
+        pass
+
+    def arrowkey_rotation(self, direction):
+        """
+        Holding the left or right arrow key scrubs through the recording.
+        """
+        self.seek(self.playhead + direction * max(1, abs(self.speed)))
+
+    def arrowkey_acceleration(self, force):
+        pass
+
+    def close(self):
+        self.cache.close()
+        self.recording.close()
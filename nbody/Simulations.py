@@ -1,6 +1,7 @@
 from random import randint, uniform
-from Color import Color
-from Particle import Arrow, Planet, UserParticle
+from .Color import Color
+from .Particle import Arrow, Planet, UserParticle
+from .Neighbours import NeighbourList
 from math import sqrt, sin, cos
 
 
@@ -9,11 +10,25 @@ class N_Body:
     Simulation parent class. All other classes inherit all functionality from
     this class, with the exception of different generate_bodies functions,
     which determines the actual bodies in the simulation. New simulations can
-    be added by just inhereting this class, and importing them to main.py.
+    be added by just inhereting this class, and registering them in __init__.py.
     """
     
     def __init__(self, G):
         self.G = G
+        self.neighbours = None
+        self.cutoff_force = False
+
+    def use_neighbour_list(self, cutoff=0, skin=10, cutoff_force=False):
+        """
+        Finds bodies to merge with a neighbour list instead of checking all
+        bodies. With cutoff_force, the gravitational pull is only computed 
+        for bodies closer than the cutoff distance as well, which then has to
+        be positive.
+        """
+        if cutoff_force and cutoff <= 0:
+            raise ValueError('cutoff_force needs a positive cutoff distance')
+        self.neighbours = NeighbourList(cutoff, skin)
+        self.cutoff_force = cutoff_force
         
     def update_bodies(self, iteration):
         """
@@ -21,6 +36,8 @@ class N_Body:
         net force, updating velocity and updating postions. The trail is not
         updated every iteration to save computational load.
         """
+        if self.neighbours is not None:
+            return self.update_bodies_neighbours(iteration)
         for p in self.bodies:
             p.merge(self.bodies)  
             p.update_force(self.bodies, self.G)
@@ -28,6 +45,27 @@ class N_Body:
             p.update_position() 
             if iteration % 4 == 0:
                 p.update_trail()
+
+    def update_bodies_neighbours(self, iteration):
+        """
+        Same as update_bodies, but uses the neighbour list to find the 
+        bodies to merge with and, with a cutoff force law, the bodies that
+        exert a force.
+        """
+        self.neighbours.update(self.bodies)
+        for p in self.bodies:
+            candidates = self.neighbours.candidates(p)
+            for b in p.merge(self.bodies, candidates):
+                self.neighbours.absorb(p, b)
+            if self.cutoff_force:
+                nearby = self.neighbours.within(p, self.neighbours.cutoff)
+                p.update_force(nearby, self.G)
+            else:
+                p.update_force(self.bodies, self.G)
+            p.update_velocity()
+            p.update_position() 
+            if iteration % 4 == 0:
+                p.update_trail()
             
     def draw(self, screen, pan_offset, background_colour):
         """
@@ -66,6 +104,27 @@ class N_Body:
         """
         pass
         
+    def zoom_view(self, factor, center, pan_offset):
+        """
+        Function can be overriden in simulations that support zooming
+        """
+        pass
+
+    def key_pressed(self, key):
+        """
+        Function can be overriden in simulations to respond to key presses
+        """
+        pass
+
+    def info_text(self):
+        """
+        Function can be overriden in simulations to show extra information
+        on screen, as a list of printeable strings
+        """
+        if self.neighbours is not None:
+            return self.neighbours.string_stats()
+        return []
+        
 
 
 
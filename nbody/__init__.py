@@ -0,0 +1,34 @@
+from importlib import import_module
+
+
+"""
+N-body simulation package. Importing it is cheap: pygame is only loaded
+when a window is opened, and scenarios are registered by name so their
+module is only imported when the scenario is created.
+"""
+
+SCENARIOS = {}
+
+
+def register(name, target, **params):
+    """
+    Registers a scenario under a name. The target is a 'module:class' string
+    of an N_Body subclass, params are passed on to its generate_bodies.
+    """
+    SCENARIOS[name] = (target, params)
+
+
+def create(name, G=0.001, max_pos=(800, 800)):
+    """
+    Imports and creates a registered scenario, and generates its bodies.
+    """
+    target, params = SCENARIOS[name]
+    module, cls = target.split(':')
+    sim = getattr(import_module(module), cls)(G=G)
+    sim.generate_bodies(max_pos=list(max_pos), **params)
+    return sim
+
+
+register('random', 'nbody.Simulations:Random_sim', nr_planets=5, nr_particles=50)
+register('solar', 'nbody.Simulations:Solar_system', nr_planets=60)
+register('user', 'nbody.Simulations:User_controlled')
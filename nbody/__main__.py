@@ -0,0 +1,74 @@
+import argparse
+from . import SCENARIOS, create
+
+
+"""
+Entry point, run with python -m nbody. Without --ticks a window is opened,
+with --ticks the simulation runs as a batch job without pygame.
+"""
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='nbody')
+    parser.add_argument('scenario', nargs='?', default='user', choices=SCENARIOS)
+    parser.add_argument('--replay', metavar='PATH', help='play back a recording instead')
+    parser.add_argument('--record', metavar='PATH', help='record the simulation to a file')
+    parser.add_argument('--ticks', type=int, help='run this many ticks without a window')
+    parser.add_argument('--size', type=int, nargs=2, default=[800, 800])
+    parser.add_argument('--neighbours', type=float, metavar='CUTOFF',
+                        help='use a neighbour list with this cutoff distance')
+    parser.add_argument('--skin', type=float, help='skin distance of the neighbour list')
+    parser.add_argument('--cutoff-force', action='store_true',
+                        help='only compute the pull of bodies within the cutoff')
+    args = parser.parse_args(args)
+    if args.replay is not None and args.record is not None:
+        parser.error('a replay can not be recorded, --replay can not be combined with --record')
+    if args.replay is not None and args.neighbours is not None:
+        parser.error('a replay does not simulate, --replay can not be combined with --neighbours')
+    if args.neighbours is None and (args.cutoff_force or args.skin is not None):
+        parser.error('--skin and --cutoff-force need --neighbours')
+    if args.cutoff_force and args.neighbours <= 0:
+        parser.error('--cutoff-force needs a positive --neighbours cutoff')
+
+    if args.ticks is not None:
+        if args.replay is not None:
+            parser.error('--replay needs a window, it can not be combined with --ticks')
+        sim = simulation(args)
+        if args.record is not None:
+            from .Replay import Recorder
+            with Recorder(args.record) as recorder:
+                for i in range(args.ticks):
+                    sim.update_bodies(i)
+                    recorder.write(sim.bodies)
+        else:
+            for i in range(args.ticks):
+                sim.update_bodies(i)
+        return
+
+    from .Main import run
+    if args.replay is not None:
+        from .Replay import Replay
+        sim = Replay(args.replay)
+        try:
+            run(sim, *args.size)
+        finally:
+            sim.close()
+    else:
+        sim = simulation(args)
+        run(sim, *args.size, record_path=args.record)
+
+
+def simulation(args):
+    """
+    Creates the scenario given on the command line, with a neighbour list if
+    one was asked for.
+    """
+    sim = create(args.scenario, max_pos=args.size)
+    if args.neighbours is not None:
+        skin = {} if args.skin is None else {'skin': args.skin}
+        sim.use_neighbour_list(args.neighbours, cutoff_force=args.cutoff_force, **skin)
+    return sim
+
+
+if __name__ == '__main__':
+    main()
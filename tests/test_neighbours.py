@@ -0,0 +1,86 @@
+import random
+import pytest
+import nbody
+import nbody.__main__
+from nbody.Particle import Planet
+from nbody.Simulations import N_Body
+
+
+def run(scenario, seed, ticks, neighbour_list):
+    """
+    Runs a scenario and returns the mass, position and velocity of the
+    remaining bodies. Every 50 ticks a body is drawn in, to also cover bodies
+    that are added after the neighbour list was built.
+    """
+    random.seed(seed)
+    sim = nbody.create(scenario)
+    if neighbour_list:
+        sim.use_neighbour_list(skin=10)
+    for i in range(ticks):
+        if i % 50 == 0:
+            sim.user_drawn_particle((400, 400), (300, 420), 3, (0, 0))
+        sim.update_bodies(i)
+    return [(b.m, *b.p, *b.v) for b in sim.bodies]
+
+
+@pytest.mark.parametrize('scenario', ['random', 'solar'])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_neighbour_list_matches_brute_force(scenario, seed):
+    expected = run(scenario, seed, 300, neighbour_list=False)
+    result = run(scenario, seed, 300, neighbour_list=True)
+    assert len(result) == len(expected)
+    for r, e in zip(result, expected):
+        assert r == pytest.approx(e)
+
+
+@pytest.mark.parametrize('neighbour_list', [False, True])
+def test_merge_radius_grows_during_merge(neighbour_list):
+    # The first merge grows the radius of the first body from 10 to 12, which
+    # brings the last body within its radius in the same pass
+    sim = N_Body(G=0)
+    sim.bodies = [Planet([x, y], m, (0,0,0), (0,0,0), [0,0], 10) for x, y, m in
+                  [(100, 100, 1000.1), (109, 100, 1000.1), (500, 500, 1), (100, 111, 1)]]
+    if neighbour_list:
+        sim.use_neighbour_list(skin=10)
+    sim.update_bodies(0)
+    assert [b.m for b in sim.bodies] == pytest.approx([2001.2, 1])
+
+def test_neighbour_list_finds_all_pairs_within_cutoff(monkeypatch):
+    random.seed(1)
+    sim = nbody.create('random')
+    sim.use_neighbour_list(cutoff=40, skin=1, cutoff_force=True)
+    within = type(sim.neighbours).within
+    missed = []
+
+    def checked_within(self, body, distance):
+        found = within(self, body, distance)
+        for b in sim.bodies:
+            if b is not body and b not in found:
+                if (b.p[0] - body.p[0])**2 + (b.p[1] - body.p[1])**2 < distance**2:
+                    missed.append((body, b))
+        return found
+
+    monkeypatch.setattr(type(sim.neighbours), 'within', checked_within)
+    for i in range(300):
+        sim.update_bodies(i)
+    assert missed == []
+
+
+def test_cutoff_force_needs_cutoff():
+    sim = nbody.create('random')
+    with pytest.raises(ValueError):
+        sim.use_neighbour_list(cutoff_force=True)
+
+
+def test_command_line_enables_neighbour_list(monkeypatch):
+    created = []
+
+    def create(*args, **kwargs):
+        created.append(nbody.create(*args, **kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(nbody.__main__, 'create', create)
+    nbody.__main__.main(['random', '--ticks', '5', '--neighbours', '40', '--skin', '2', '--cutoff-force'])
+    sim = created[0]
+    assert (sim.neighbours.cutoff, sim.neighbours.skin, sim.cutoff_force) == (40, 2, True)
+    assert sim.neighbours.rebuilds > 0
@@ -0,0 +1,183 @@
+import random
+import sys
+import types
+import pytest
+import nbody
+from nbody.__main__ import main
+from nbody.Replay import (COLUMNS, POSITIONS, POSITION_BYTES, Recorder,
+                          Recording, Replay)
+
+
+TICKS = 40
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """
+    Records a run of the random scenario, and returns the path of the
+    recording and the uid, x and y of the live bodies after every tick.
+    """
+    random.seed(1)
+    sim = nbody.create('random')
+    path = tmp_path / 'run.nbody'
+    states = []
+    with Recorder(path) as recorder:
+        for i in range(TICKS):
+            sim.update_bodies(i)
+            recorder.write(sim.bodies)
+            states.append(sorted((b.uid, b.p[0], b.p[1]) for b in sim.bodies))
+    return path, states
+
+
+@pytest.fixture
+def replay(recorded):
+    replay = Replay(recorded[0])
+    yield replay
+    replay.close()
+
+
+@pytest.fixture
+def stub_pygame(monkeypatch):
+    """
+    Replaces pygame by a module that counts the shapes drawn.
+    """
+    calls = {'line': 0, 'circle': 0, 'polygon': 0}
+    draw = types.SimpleNamespace(**{name: lambda *args, name=name: calls.__setitem__(name, calls[name] + 1)
+                                    for name in calls})
+    monkeypatch.setitem(sys.modules, 'pygame', types.SimpleNamespace(draw=draw))
+    return calls
+
+
+def frame_state(frame):
+    return list(zip(frame.uid, frame.x, frame.y))
+
+
+def test_recording_matches_live_bodies(recorded):
+    path, states = recorded
+    recording = Recording(path)
+    assert recording.nr_frames == TICKS
+    for i, state in enumerate(states):
+        frame = recording.frame(i)
+        assert [uid for uid, x, y in frame_state(frame)] == [uid for uid, x, y in state]
+        for (uid, x, y), (_, live_x, live_y) in zip(frame_state(frame), state):
+            assert (x, y) == pytest.approx((live_x, live_y), rel=1e-6)
+    recording.close()
+
+
+def test_column_layout(recorded):
+    recording = Recording(recorded[0])
+    frame = recording.frame(0)
+    assert frame.full
+    for name, typecode, width in COLUMNS:
+        assert getattr(frame, name).typecode == typecode
+        assert len(getattr(frame, name)) == frame.n * width
+    positions = recording.frame(0, POSITIONS)
+    assert not positions.full
+    assert not hasattr(positions, 'color')
+    assert positions.nbytes == frame.n * POSITION_BYTES
+    assert frame_state(positions) == frame_state(frame)
+    recording.close()
+
+
+def test_ticks_run_records_every_tick(tmp_path):
+    path = tmp_path / 'batch.nbody'
+    random.seed(2)
+    main(['solar', '--ticks', '10', '--record', str(path)])
+    random.seed(2)
+    sim = nbody.create('solar')
+    for i in range(10):
+        sim.update_bodies(i)
+    recording = Recording(path)
+    assert recording.nr_frames == 10
+    frame = recording.frame(9)
+    live = sorted(sim.bodies, key=lambda b: b.uid)
+    assert frame.n == len(live)
+    assert list(frame.x) == pytest.approx([b.p[0] for b in live], rel=1e-6)
+    assert list(frame.y) == pytest.approx([b.p[1] for b in live], rel=1e-6)
+    recording.close()
+
+
+def test_incomplete_recordings_are_rejected(recorded, tmp_path):
+    data = recorded[0].read_bytes()
+    files = {'empty': b'', 'short': data[:10], 'truncated': data[:-1]}
+    for name, content in files.items():
+        (tmp_path / name).write_bytes(content)
+    Recorder(tmp_path / 'no_frames').close()
+    for name in list(files) + ['no_frames']:
+        with pytest.raises(ValueError):
+            Recording(tmp_path / name)
+
+
+def test_seek_is_clamped(replay):
+    replay.seek(-5)
+    assert replay.frame_nr == 0
+    replay.seek(TICKS + 100)
+    assert replay.frame_nr == TICKS - 1
+
+
+def test_playback_speed_and_direction(replay):
+    replay.speed = 0.5
+    for i in range(4):
+        replay.update_bodies(i)
+    assert replay.frame_nr == 2
+    replay.speed = -1
+    replay.update_bodies(4)
+    assert replay.frame_nr == 1
+
+
+def test_playback_pauses_at_either_end(replay):
+    replay.speed = 7
+    for i in range(TICKS):
+        replay.update_bodies(i)
+    assert replay.paused
+    assert replay.frame_nr == TICKS - 1
+    replay.paused = False
+    replay.speed = -7
+    for i in range(TICKS):
+        replay.update_bodies(i)
+    assert replay.paused
+    assert replay.frame_nr == 0
+
+
+def test_trail_follows_recorded_positions(recorded, replay):
+    states = recorded[1]
+    replay.seek(21)
+    frame = replay.cache.get(21)
+    history = [replay.cache.recording.frame(i, POSITIONS) for i in replay.trail_frames(21, 3)]
+    k = frame.n - 1
+    uid = frame.uid[k]
+    expected = []
+    for i in [21, 20, 16, 12]:
+        expected += [c for u, x, y in states[i] if u == uid for c in (x, y)]
+    positions = replay.trail_positions([0, 0], frame, k, history)
+    assert len(positions) == 4
+    assert [c for p in positions for c in p] == pytest.approx(expected, rel=1e-6)
+    assert history[0].index(uid, k) is not None
+    assert history[0].index(-1) is None
+
+
+def test_draw_with_stub_pygame(replay, stub_pygame):
+    replay.seek(TICKS - 1)
+    replay.draw(None, [0, 0], None)
+    frame = replay.cache.get(TICKS - 1)
+    assert stub_pygame['circle'] + stub_pygame['polygon'] == frame.n
+
+
+def test_requested_frames_are_not_evicted(replay):
+    cache = replay.cache
+    frame = cache.recording.frame(0)
+    cache.max_bytes = 3 * frame.nbytes
+    with cache.lock:
+        cache.frames.clear()
+        cache.nbytes = 0
+        cache.pinned = {0, 1}
+        for i in range(6):
+            cache.store(i, cache.recording.frame(i))
+    assert 0 in cache.frames and 1 in cache.frames
+    assert cache.nbytes <= cache.max_bytes
+
+def test_close_stops_prefetch_thread(recorded):
+    replay = Replay(recorded[0])
+    thread = replay.cache.thread
+    replay.close()
+    assert not thread.is_alive()